@@ -1 +1,2 @@
 from .api import AwareDB
+from .async_api import AsyncAwareDB
@@ -1,14 +1,74 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+import gzip
+import hashlib
+import hmac
 import json
+import os
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InvalidHeader
+from urllib3.util.retry import Retry
 
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
 
-class AwareDB:
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# Number of nodes sent on each update when loading files
+LOAD_CHUNK_SIZE = 500
+
+# Number of chunk updates in flight when loading files with the async client
+LOAD_CONCURRENCY = 4
+
+# Seconds a cached login token is reused before logging in again
+TOKEN_CACHE_TTL = 24 * 60 * 60
+
+# PBKDF2 iterations of the password hash checked before reusing a cached token
+TOKEN_CACHE_HASH_ITERATIONS = 200_000
+
+# Read commands whose responses can be cached, and commands invalidating them
+CACHED_COMMANDS = ("get", "query")
+WRITE_COMMANDS = ("update", "remove", "flush")
+
+# Transient response statuses retried with exponential backoff
+RETRY_STATUSES = (429, 502, 503, 504)
+RETRY_ATTEMPTS = 5
+
+# Longest wait in seconds between retries, also when asked by the server
+RETRY_MAX_DELAY = 30.0
+
+# Content type of responses streamed one JSON document per line, and the
+# statuses of servers rejecting it, answered with a regular query instead
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+NDJSON_REJECTED_STATUSES = (406, 415)
+
+# Request bodies above this size are gzip compressed, when enabled
+GZIP_THRESHOLD = 16 * 1024
+
+
+class BaseAwareDB(ABC):
     """
-    Python API to interact with AwareDB.
+    Commands shared by the sync and async Python APIs of AwareDB.
+
+    Subclasses only need to implement how a command is sent to the server
+    through ``_request``, relying on ``_cache_key`` and ``_cache_response`` to
+    cache read responses. On async subclasses ``_request`` is a coroutine, so
+    every command returns an awaitable instead of the server response.
     """
 
     # pylint: disable=too-many-arguments
@@ -19,6 +79,9 @@ class AwareDB:
         user: str = None,
         password: str = None,
         host: str = None,
+        token_cache: bool = False,
+        cache_size: int = 0,
+        compress: bool = False,
     ):
         """
         :param db: Name of the database to connect to
@@ -31,45 +94,126 @@ class AwareDB:
         :type host: str
         :param token: Token of the database to connect to
         :type token: str
+        :param token_cache: Reuse tokens obtained with username and password
+            across processes, stored under ``~/.cache/awaredb``. Cached tokens
+            are only reused with the same credentials. Defaults to False.
+        :type token_cache: bool
+        :param cache_size: Number of ``get`` and ``query`` responses kept in
+            memory until data is changed by this client. Defaults to 0 (disabled).
+        :type cache_size: int
+        :param compress: Gzip request bodies larger than 16 KB. Requires a server
+            accepting ``Content-Encoding: gzip``. Defaults to False.
+        :type compress: bool
         """
         self.host = host or "https://aware-db.com"
         self.db = db
         self.user = user
         self.password = password
         self.token = token
+        self._validated = False
+
+        # Command URLs are built once and reused on every request
+        self._base = f"{self.host}/rest/db/{db}"
+        self._urls: Dict[str, str] = {}
+
+        # Encoded responses of read commands, least recently used first
+        self._cache_size = cache_size
+        self._cache: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self._compress = compress
 
         # Check if token or user and pass are provided
         if not token and not (user and password):
             raise ValueError("Database token or username and password are required")
 
-        # If token is not provided, get it from the server
-        if not self.token:
-            self.token = self._get_token(user=user, password=password)
+        # Tokens are only cached when obtained through a login
+        self._token_cache = None
+        if token_cache and not token:
+            self._token_cache = _token_cache_path(self.host, db, user)
 
-        # Check if connection is valid
-        if not self._check_connection():
-            raise ValueError("Unable to connect to database")
+    def _url(self, command: str) -> str:
+        """
+        Returns the URL to run a command on the database.
+        """
+        url = self._urls.get(command)
+        if url is None:
+            url = self._urls[command] = f"{self._base}/{command}/"
+        return url
 
-    # -------------------------------------------------------------------------
-    # Login and connection methods
-    # -------------------------------------------------------------------------
+    def _cache_key(self, command: str, data: Dict[str, Any]) -> Optional[bytes]:
+        """
+        Returns the cache key of a command, or None if it should not be cached.
+        """
+        if not self._cache_size or command not in CACHED_COMMANDS:
+            return None
+        return _dumps([command, data], sort_keys=True)
 
-    def _check_connection(self):
+    def _cache_lookup(self, key: Optional[bytes]) -> Tuple[bool, Any]:
         """
-        Check if token is valid and if database exists.
+        Returns if a response is cached for the key, and the cached response.
+
+        Responses are decoded on every hit, so callers never share an object
+        with the cache.
         """
-        return self._request("check") == {"connected": True}
+        with self._cache_lock:
+            if key is None or key not in self._cache:
+                return False, None
+            self._cache.move_to_end(key)
+            content = self._cache[key]
+        return True, _loads(content)
 
-    def _get_token(self, user: str = None, password: str = None):
+    def _cache_response(
+        self,
+        command: str,
+        key: Optional[bytes],
+        value: Any,
+        generation: int = None,
+    ):
         """
-        Get a token from the server with the provided username and password.
+        Stores the response of a read command, or clears the cache on writes.
+
+        :param generation: Value of ``_cache_generation`` when the read was
+            sent. The response is not stored if a write cleared the cache since.
+        :type generation: int
         """
-        response = requests.post(
-            f"{self.host}/rest/auth/token/login/",
-            json={"username": user, "password": password},
-            timeout=30,
-        )
-        return response.json().get("token")
+        with self._cache_lock:
+            if command in WRITE_COMMANDS:
+                self._cache.clear()
+                self._cache_generation += 1
+            elif generation is not None and generation != self._cache_generation:
+                return
+            elif key is not None:
+                self._cache[key] = _dumps(value)
+                self._cache.move_to_end(key)
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+
+    def _encode(self, payload: Any) -> Tuple[bytes, Dict[str, str]]:
+        """
+        Encodes a payload as JSON, compressing large bodies if enabled.
+
+        :return: Request body and the headers describing its encoding
+        :rtype: Tuple[bytes, Dict[str, str]]
+        """
+        body = _dumps(payload)
+        if self._compress and len(body) > GZIP_THRESHOLD:
+            return gzip.compress(body, compresslevel=1), {"Content-Encoding": "gzip"}
+        return body, {}
+
+    def _can_login(self) -> bool:
+        """
+        Check if a new token can be requested when the current one is rejected.
+        """
+        return bool(self.user and self.password)
+
+    def _then(self, response: Any, func: Callable[[Any], Any]) -> Any:
+        """
+        Applies a function to a response returned by ``_request``.
+
+        Async subclasses apply it once the response is awaited.
+        """
+        return func(response)
 
     # -------------------------------------------------------------------------
     # Read database commands
@@ -79,6 +223,7 @@ class AwareDB:
         self,
         path: str,
         states: List[str] = None,
+        fresh: bool = False,
     ) -> Any:
         """
         Returns the value of a specific path from nodes in the database
@@ -87,11 +232,41 @@ class AwareDB:
         :type path: str
         :param states: List of states from which data should be retrieved.
         :type states: List[str]
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
         :return: Value of the path
         :rtype: Any
         """
         data = {"path": path, "states": states or []}
-        return self._request("get", data)
+        return self._request("get", data, fresh=fresh)
+
+    def get_many(
+        self,
+        paths: List[str],
+        states: List[str] = None,
+        fresh: bool = False,
+    ) -> List[Any]:
+        """
+        Returns the values of several paths from nodes in a single request.
+
+        :param paths: Paths to get from the database.
+        :type paths: List[str]
+        :param states: List of states from which data should be retrieved.
+        :type states: List[str]
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
+        :return: Values of the paths, in the same order.
+        :rtype: List[Any]
+        """
+        paths = list(paths)
+
+        # A single formula is answered with its value instead of a list
+        if len(paths) == 1:
+            data = {"path": paths[0], "states": states or []}
+            return self._then(self._request("get", data, fresh=fresh), _as_list)
+
+        data = {"formula": paths, "states": states or []}
+        return self._request("calculate", data)
 
     def query(
         self,
@@ -100,6 +275,7 @@ class AwareDB:
         properties: List[str] = None,
         states: List[str] = None,
         show_abstract: bool = False,
+        fresh: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Returns a list of nodes based on the input.
@@ -114,17 +290,13 @@ class AwareDB:
         :type states: List[str]
         :param show_abstract: If abstract nodes should be retrieved. Defaults to False.
         :type show_abstract: bool
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
         :return: Value of the path
         :rtype: Dict[str, Any]
         """
-        data = {
-            "nodes": nodes or ["*"],
-            "conditions": conditions or [],
-            "properties": properties or [],
-            "states": states or [],
-            "show_abstract": show_abstract,
-        }
-        return self._request("query", data)
+        data = _query_payload(nodes, conditions, properties, states, show_abstract)
+        return self._request("query", data, fresh=fresh)
 
     def calculate(
         self,
@@ -142,7 +314,7 @@ class AwareDB:
         :return: Value of the formula
         :rtype: Union[Dict[str, Any], List[Dict[str, Any]]]
         """
-        data = {"formula": formula, states: states or []}
+        data = _payload(formula=formula, states=states or [])
         return self._request("calculate", data)
 
     def what_if(
@@ -160,7 +332,7 @@ class AwareDB:
         :return: Dictionary with the impacts of the changes.
         :rtype: Dict[str, Any]
         """
-        data = {"changes": changes, states: states or []}
+        data = _payload(changes=changes, states=states or [])
         return self._request("what-if", data)
 
     # -------------------------------------------------------------------------
@@ -233,22 +405,24 @@ class AwareDB:
         :return: List of changes.
         :rtype: List[Dict[str, Any]]
         """
-        data = {
-            "change_id": change_id,
-            "ids": ids,
-            "start": start,
-            "end": end,
-            "from_date": from_date,
-            "to_date": to_date,
-        }
-        data = {key: value for key, value in data.items() if value is not None}
+        data = _payload(
+            change_id=change_id,
+            ids=ids,
+            start=start,
+            end=end,
+            from_date=from_date,
+            to_date=to_date,
+        )
         return self._request("history", data)
 
     # -------------------------------------------------------------------------
     # Generic methods to handle command requests
     # -------------------------------------------------------------------------
 
-    def _request(self, command: str, data: Dict[str, Any] = None) -> Any:
+    @abstractmethod
+    def _request(
+        self, command: str, data: Dict[str, Any] = None, fresh: bool = False
+    ) -> Any:
         """
         Run a command on the server
 
@@ -256,71 +430,798 @@ class AwareDB:
         :type command: str
         :param data: Data to send to the server as part of the command.
         :type data: Dict[str, Any]
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
         :return: Servers response
         :rtype: Any
         """
-        url = f"{self.host}/rest/db/{self.db}/{command}/"
-        response = requests.post(
-            url,
-            json=data or {},
-            headers={"Authorization": f"Token {self.token}"},
-            timeout=180,
+
+    def _check_response(self, status: int, content: bytes):
+        """
+        Raises if the server did not run a command successfully.
+
+        :param status: Status of the server response.
+        :type status: int
+        :param content: Content of the server response.
+        :type content: bytes
+        """
+        # Until a command succeeds, a rejection means connection details are wrong
+        if not self._validated and status in (401, 403, 404):
+            raise ValueError("Unable to connect to database", content)
+
+        if status == 400:
+            raise ValueError("Invalid request", _loads(content))
+        if status != 200:
+            raise ValueError("Invalid request", content)
+        self._validated = True
+
+    def _query_iter_request(
+        self,
+        nodes: List[str] = None,
+        conditions: List[str] = None,
+        properties: List[str] = None,
+        states: List[str] = None,
+        show_abstract: bool = False,
+    ) -> Tuple[str, bytes, Dict[str, str]]:
+        """
+        Builds a query asking the server to stream nodes as NDJSON.
+
+        :return: URL, body and headers of the request
+        :rtype: Tuple[str, bytes, Dict[str, str]]
+        """
+        data = _query_payload(nodes, conditions, properties, states, show_abstract)
+        body, headers = self._encode(data)
+        headers["Accept"] = NDJSON_CONTENT_TYPE
+        return self._url("query"), body, headers
+
+
+class AwareDB(BaseAwareDB):
+    """
+    Python API to interact with AwareDB.
+
+    Use it as a context manager, or call ``close``, to release its connections:
+
+        with AwareDB(db="<my_db>", token="<my_token>") as awaredb:
+            awaredb.get("car.power")
+
+    Instances are not thread-safe and should not be shared between threads.
+    The only exception is ``batch_window_ms``, which sends queued calls from a
+    timer thread; the response cache is locked for it.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        db: str,
+        token=None,
+        user: str = None,
+        password: str = None,
+        host: str = None,
+        token_cache: bool = False,
+        cache_size: int = 0,
+        compress: bool = False,
+        batch_window_ms: int = None,
+        transport: str = "requests",
+    ):
+        """
+        See ``BaseAwareDB`` for the connection parameters.
+
+        :param batch_window_ms: If set, ``get`` returns a ``Future`` and calls
+            made within this window are sent together in a single request.
+        :type batch_window_ms: int
+        :param transport: HTTP client used, ``requests`` or ``httpx`` to send
+            requests over HTTP/2, one at a time. Defaults to ``requests``.
+        :type transport: str
+        """
+        if transport not in ("requests", "httpx"):
+            raise ValueError(f"Unknown transport {transport}")
+        if transport == "httpx" and httpx is None:
+            raise ImportError(
+                "httpx is required for the httpx transport: pip install awaredb[http2]"
+            )
+        super().__init__(
+            db,
+            token=token,
+            user=user,
+            password=password,
+            host=host,
+            token_cache=token_cache,
+            cache_size=cache_size,
+            compress=compress,
+        )
+
+        # Single session so every call reuses the same connection pool
+        if transport == "httpx":
+            self._session = _HttpxTransport()
+        else:
+            self._session = _RequestsTransport()
+        self._session.headers.update({"Content-Type": "application/json"})
+
+        # If token is not provided, reuse a cached one or get it from the server
+        if not self.token and self._token_cache:
+            self.token = _read_cached_token(self._token_cache, self.password)
+        if self.token:
+            self._session.headers.update({"Authorization": f"Token {self.token}"})
+        else:
+            self._login()
+
+        # Queued ``get`` calls, grouped by states, waiting to be sent together
+        self._batch_window_ms = batch_window_ms
+        self._batch_depth = 0
+        self._batch_lock = threading.Lock()
+        self._flush_lock = threading.RLock()
+        self._batch_timer = None
+        self._pending_gets: Dict[
+            Tuple[str, ...], List[Tuple[str, Optional[bytes], Future]]
+        ] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -------------------------------------------------------------------------
+    # Login and connection methods
+    # -------------------------------------------------------------------------
+
+    def close(self):
+        """
+        Sends queued ``get`` calls and releases the connection pool.
+        """
+        try:
+            self._flush_gets()
+        finally:
+            self._session.close()
+
+    def ping(self):
+        """
+        Check if token is valid and if database exists.
+
+        Connection is otherwise validated on the first command sent.
+        """
+        if not self._check_connection():
+            raise ValueError("Unable to connect to database")
+
+    def _check_connection(self):
+        """
+        Check if token is valid and if database exists.
+        """
+        return self._request("check") == {"connected": True}
+
+    def _login(self):
+        """
+        Get a new token from the server and store it on the token cache.
+        """
+        # Login is sent without the rejected token, which the server may refuse
+        self._session.headers.pop("Authorization", None)
+        self.token = self._get_token(user=self.user, password=self.password)
+        if self.token:
+            self._session.headers.update({"Authorization": f"Token {self.token}"})
+            if self._token_cache:
+                _write_cached_token(self._token_cache, self.token, self.password)
+        elif self._token_cache:
+            _remove_cached_token(self._token_cache)
+
+    def _get_token(self, user: str = None, password: str = None):
+        """
+        Get a token from the server with the provided username and password.
+        """
+        response = self._post(
+            f"{self.host}/rest/auth/token/login/",
+            {"username": user, "password": password},
+            timeout=30,
+        )
+        return _loads(response.content).get("token")
+
+    # -------------------------------------------------------------------------
+    # Generic methods to handle command requests
+    # -------------------------------------------------------------------------
+
+    def _post(self, url: str, payload: Any, timeout: float = 180):
+        """
+        Posts a payload encoded as JSON in a single pass, with the configured
+        transport.
+        """
+        body, headers = self._encode(payload)
+        return self._session.post(url, body, headers, timeout)
+
+    def _request(
+        self, command: str, data: Dict[str, Any] = None, fresh: bool = False
+    ) -> Any:
+        """
+        Run a command on the server
+
+        :param command: Command to execute on the server.
+        :type command: str
+        :param data: Data to send to the server as part of the command.
+        :type data: Dict[str, Any]
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
+        :return: Servers response
+        :rtype: Any
+        """
+        key = self._cache_key(command, data or {})
+        if not fresh:
+            cached, result = self._cache_lookup(key)
+            if cached:
+                return result
+
+        # Queued reads were made before this write, send them first
+        if command in WRITE_COMMANDS:
+            self._flush_gets()
+
+        # Reads are not cached if a write clears the cache while in flight
+        generation = self._cache_generation
+        url = self._url(command)
+        response = self._post(url, data or {})
+
+        # Token expired or was revoked, login again and retry once
+        if response.status_code == 401 and self._can_login():
+            self._login()
+            response = self._post(url, data or {})
+
+        self._check_response(response.status_code, response.content)
+
+        result = _loads(response.content).get("data")
+        self._cache_response(command, key, result, generation=generation)
+        return result
+
+    # -------------------------------------------------------------------------
+    # Streaming database commands
+    # -------------------------------------------------------------------------
+
+    def query_iter(
+        self,
+        nodes: List[str] = None,
+        conditions: List[str] = None,
+        properties: List[str] = None,
+        states: List[str] = None,
+        show_abstract: bool = False,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Yields nodes based on the input, as they are streamed by the server.
+
+        Takes the same parameters as ``query``. If the server does not stream
+        NDJSON, nodes are yielded from the regular response instead.
+        """
+        url, body, headers = self._query_iter_request(
+            nodes, conditions, properties, states, show_abstract
         )
-        if response.status_code == 400:
-            raise ValueError("Invalid request", response.json())
-        if response.status_code != 200:
-            raise ValueError("Invalid request", response.content)
-        return response.json().get("data")
+
+        # Token expired or was revoked, login again and retry once
+        for attempt in range(2):
+            # pylint: disable-next=contextmanager-generator-missing-cleanup
+            with self._session.stream(url, body, headers, timeout=180) as response:
+                status = response.status_code
+                if status == 200:
+                    self._validated = True
+                    if _is_ndjson(response.headers):
+                        for line in response.iter_lines():
+                            if line:
+                                yield _loads(line)
+                    else:
+                        content = self._session.read(response)
+                        yield from _loads(content).get("data") or []
+                    return
+                content = self._session.read(response)
+
+            if status != 401 or attempt or not self._can_login():
+                break
+            self._login()
+
+        # Server does not stream NDJSON, answer with a regular query
+        if status in NDJSON_REJECTED_STATUSES:
+            yield from self.query(
+                nodes, conditions, properties, states, show_abstract, fresh=True
+            )
+            return
+        self._check_response(status, content)
+
+    # -------------------------------------------------------------------------
+    # Batch methods to group commands on a single request
+    # -------------------------------------------------------------------------
+
+    def get(self, path: str, states: List[str] = None, fresh: bool = False) -> Any:
+        """
+        Returns the value of a specific path from nodes in the database
+
+        Inside a ``batch`` block, or when ``batch_window_ms`` is set, the call
+        is queued and a ``concurrent.futures.Future`` with the value is returned.
+
+        :param path: Path to get from the database.
+        :type path: str
+        :param states: List of states from which data should be retrieved.
+        :type states: List[str]
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
+        :return: Value of the path
+        :rtype: Any
+        """
+        if self._batch_depth or self._batch_window_ms:
+            return self._queue_get(path, states, fresh=fresh)
+        return super().get(path, states=states, fresh=fresh)
+
+    @contextmanager
+    def batch(self) -> Iterator["AwareDB"]:
+        """
+        Collects ``get`` calls and sends them in a single request on exit.
+
+            with awaredb.batch():
+                power = awaredb.get("car.power")
+                speed = awaredb.get("car.speed")
+            print(power.result(), speed.result())
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._flush_gets()
+
+    def _queue_get(
+        self, path: str, states: List[str] = None, fresh: bool = False
+    ) -> Future:
+        """
+        Queues a ``get`` call to be sent on the next batch request.
+
+        Cached values resolve the future right away, unless ``fresh`` is set.
+        """
+        future = Future()
+        key = self._cache_key("get", {"path": path, "states": states or []})
+        if not fresh:
+            cached, value = self._cache_lookup(key)
+            if cached:
+                future.set_result(value)
+                return future
+
+        with self._batch_lock:
+            self._pending_gets.setdefault(tuple(states or []), []).append(
+                (path, key, future)
+            )
+
+            # Outside of a batch block, send queued calls when the window ends
+            if not self._batch_depth and self._batch_timer is None:
+                self._batch_timer = threading.Timer(
+                    self._batch_window_ms / 1000, self._flush_gets
+                )
+                self._batch_timer.daemon = True
+                self._batch_timer.start()
+        return future
+
+    def _flush_gets(self):
+        """
+        Sends all queued ``get`` calls, one request for each group of states.
+
+        Holds ``_flush_lock`` while sending, so a write waits for reads already
+        taken by the timer thread.
+        """
+        with self._flush_lock:
+            with self._batch_lock:
+                pending, self._pending_gets = self._pending_gets, {}
+                if self._batch_timer is not None:
+                    self._batch_timer.cancel()
+                    self._batch_timer = None
+
+            for states, queued in pending.items():
+                self._send_gets(list(states), queued)
+
+    def _send_gets(
+        self, states: List[str], queued: List[Tuple[str, Optional[bytes], Future]]
+    ):
+        """
+        Sends queued ``get`` calls of the same states and resolves their futures.
+        """
+        generation = self._cache_generation
+        try:
+            values = self.get_many(
+                [path for path, _, _ in queued], states, fresh=True
+            )
+            if not isinstance(values, list) or len(values) != len(queued):
+                raise ValueError("Invalid batch response", values)
+        except Exception as error:  # pylint: disable=broad-except
+            for _, _, future in queued:
+                future.set_exception(error)
+            return
+
+        for (_, key, future), value in zip(queued, values):
+            self._cache_response("get", key, value, generation=generation)
+            future.set_result(value)
 
     # -------------------------------------------------------------------------
     # Load and save database methods
     # -------------------------------------------------------------------------
 
-    def load(self, filepath: str, recursive: bool = False, flush: bool = False):
+    def load(
+        self,
+        filepath: str,
+        recursive: bool = False,
+        flush: bool = False,
+        chunk_size: int = LOAD_CHUNK_SIZE,
+    ):
         """
         Load a file or folder of JSONs into the database.
-        """
-        path = Path(filepath)
 
-        # If path is invalid, theres nothing to load
-        if not path.exists():
-            raise ValueError(f"Path {path} does not exist.")
+        Nodes are read one file at a time and uploaded in chunks of
+        ``chunk_size`` nodes, so only one chunk is kept in memory.
+
+        Unlike a single update, chunks are not applied atomically: if one fails,
+        the chunks sent before it stay applied.
+        """
+        path = _load_path(filepath, chunk_size)
 
         # If flush is True, remove all data from database
         if flush:
             self.flush()
 
-        # Gather data to be loaded
-        data = []
-        if path.is_dir():
-            self._load_folder(data, path, recursive)
-        else:
-            self._load_file(data, path)
+        # Upload data to database as it is gathered
+        chunk = []
+        for node in _iter_nodes(path, recursive):
+            chunk.append(node)
+            if len(chunk) >= chunk_size:
+                self.update(chunk)
+                chunk = []
+        if chunk:
+            self.update(chunk)
 
-        # Upload data to database
-        self.update(data)
 
-    def _load_folder(
-        self, data: List[Dict[str, Any]], path: Path, recursive: bool = False
-    ):
+class _RequestsTransport:
+    """
+    Sends requests through a ``requests.Session``, retrying transient errors.
+    """
+
+    def __init__(self):
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=32,
+            max_retries=_Retry(
+                total=RETRY_ATTEMPTS,
+                backoff_factor=0.3,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=["POST"],
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self.headers = self._session.headers
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str], timeout: float):
         """
-        Loads a folder of JSONs into list of data to be loaded.
+        Posts an encoded body and returns the response.
         """
-        for file in path.iterdir():
-            if file.is_dir():
-                if recursive:
-                    self._load_folder(data, file, recursive=recursive)
-            elif file.suffix.lower() == ".json":
-                self._load_file(data, file)
+        return self._session.post(url, data=body, headers=headers, timeout=timeout)
 
-    def _load_file(self, data: List[Dict[str, Any]], path: Path):
+    @contextmanager
+    def stream(self, url: str, body: bytes, headers: Dict[str, str], timeout: float):
         """
-        Loads a JSON file into a list of data to be loaded.
+        Posts an encoded body and yields the response before it is read.
         """
-        with open(path, "r", encoding="utf-8") as f:
-            content = json.load(f)
+        with self._session.post(
+            url, data=body, headers=headers, timeout=timeout, stream=True
+        ) as response:
+            yield response
 
-        if isinstance(content, list):
-            data.extend(content)
-        else:
-            data.append(content)
+    @staticmethod
+    def read(response: Any) -> bytes:
+        """
+        Reads the content of a streamed response.
+        """
+        return response.content
+
+    def close(self):
+        """
+        Releases the connection pool.
+        """
+        self._session.close()
+
+
+class _Retry(Retry):
+    """
+    Retries of the requests adapter, waiting for ``Retry-After`` as long as
+    the other transports do.
+    """
+
+    def get_retry_after(self, response: Any) -> Optional[float]:
+        """
+        Returns the seconds asked by the server, capped to ``RETRY_MAX_DELAY``.
+
+        Invalid values fall back to the exponential backoff.
+        """
+        try:
+            retry_after = super().get_retry_after(response)
+        except InvalidHeader:
+            return None
+        if retry_after is None:
+            return None
+        return min(RETRY_MAX_DELAY, retry_after)
+
+
+class _HttpxTransport:
+    """
+    Sends requests through an ``httpx.Client`` over HTTP/2, retrying
+    transient errors.
+    """
+
+    def __init__(self):
+        # Connection errors are retried by the transport, as urllib3 does
+        self._session = httpx.Client(
+            timeout=180,
+            transport=httpx.HTTPTransport(
+                http2=True,
+                retries=RETRY_ATTEMPTS,
+                limits=httpx.Limits(max_keepalive_connections=8),
+            ),
+        )
+        self.headers = self._session.headers
+
+    def post(self, url: str, body: bytes, headers: Dict[str, str], timeout: float):
+        """
+        Posts an encoded body and returns the response.
+        """
+        with self.stream(url, body, headers, timeout) as response:
+            response.read()
+        return response
+
+    @contextmanager
+    def stream(self, url: str, body: bytes, headers: Dict[str, str], timeout: float):
+        """
+        Posts an encoded body and yields the response before it is read.
+        """
+        # Unlike the requests adapter, httpx does not retry on response status
+        for attempt in range(RETRY_ATTEMPTS + 1):
+            with self._session.stream(
+                "POST", url, content=body, headers=headers, timeout=timeout
+            ) as response:
+                status = response.status_code
+                if status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS:
+                    yield response
+                    return
+                retry_after = response.headers.get("Retry-After")
+            time.sleep(_retry_delay(attempt, retry_after))
+
+    @staticmethod
+    def read(response: Any) -> bytes:
+        """
+        Reads the content of a streamed response.
+        """
+        return response.read()
+
+    def close(self):
+        """
+        Releases the connection pool.
+        """
+        self._session.close()
+
+
+def _payload(**kwargs) -> Dict[str, Any]:
+    """
+    Builds a command payload, leaving out arguments that were not provided.
+    """
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+def _as_list(value: Any) -> List[Any]:
+    """
+    Wraps a single value in a list.
+    """
+    return [value]
+
+
+def _json_files(path: Path, recursive: bool = False) -> Iterator[Path]:
+    """
+    Yields the JSON files to be loaded from a file or folder path.
+
+    Subfolders are walked with ``os.walk`` instead of recursive calls, and
+    symlinked folders are followed.
+    """
+    if path.is_file():
+        yield path
+        return
+
+    # Unlike rglob before Python 3.13, os.walk can follow symlinked folders
+    for root, _, names in os.walk(path, followlinks=True):
+        for name in names:
+            file = Path(root, name)
+            if file.suffix.lower() == ".json" and file.is_file():
+                yield file
+        if not recursive:
+            return
+
+
+def _load_path(filepath: str, chunk_size: int, concurrency: int = 1) -> Path:
+    """
+    Returns the path to load files from, checking the arguments of a load.
+    """
+    path = Path(filepath)
+
+    # If path is invalid, theres nothing to load
+    if not path.exists():
+        raise ValueError(f"Path {path} does not exist.")
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}.")
+    if concurrency < 1:
+        raise ValueError(f"Concurrency must be at least 1, got {concurrency}.")
+    return path
+
+
+def _iter_nodes(path: Path, recursive: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the data to be loaded from a file or folder path, one file at a time.
+    """
+    for file in _json_files(path, recursive):
+        yield from _read_json(file)
+
+
+def _query_payload(
+    nodes: List[str] = None,
+    conditions: List[str] = None,
+    properties: List[str] = None,
+    states: List[str] = None,
+    show_abstract: bool = False,
+) -> Dict[str, Any]:
+    """
+    Builds the payload of a query command, see ``BaseAwareDB.query``.
+    """
+    return {
+        "nodes": nodes or ["*"],
+        "conditions": conditions or [],
+        "properties": properties or [],
+        "states": states or [],
+        "show_abstract": show_abstract,
+    }
+
+
+def _is_ndjson(headers: Any) -> bool:
+    """
+    Check if a response is streamed as newline delimited JSON.
+    """
+    return headers.get("Content-Type", "").startswith(NDJSON_CONTENT_TYPE)
+
+
+def _read_json(path: Path) -> List[Dict[str, Any]]:
+    """
+    Reads a JSON file as a list of data to be loaded.
+    """
+    content = _loads(path.read_bytes())
+    return content if isinstance(content, list) else [content]
+
+
+def _retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Returns the seconds to wait before retrying a request.
+
+    Uses the server ``Retry-After`` header when it is a valid number of
+    seconds, otherwise an exponential backoff with jitter.
+    """
+    try:
+        delay = float(retry_after)
+    except (TypeError, ValueError):
+        delay = None
+    if delay is not None and delay >= 0:
+        return min(RETRY_MAX_DELAY, delay)
+    return min(RETRY_MAX_DELAY, 0.3 * 2**attempt) * random.uniform(0.5, 1.0)
+
+
+def _token_cache_path(host: str, db: str, user: str) -> Path:
+    """
+    Returns the token cache file for a host, database and user.
+    """
+    cache_dir = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    key = hashlib.sha256("\0".join((host, db, user)).encode("utf-8")).hexdigest()
+    return cache_dir / "awaredb" / f"token-{key}.json"
+
+
+def _password_hash(password: str, salt: bytes) -> str:
+    """
+    Returns a salted slow hash of a password, to compare it without storing it.
+    """
+    return hashlib.pbkdf2_hmac(
+        "sha256", password.encode("utf-8"), salt, TOKEN_CACHE_HASH_ITERATIONS
+    ).hex()
+
+
+def _read_cached_token(path: Path, password: str) -> Optional[str]:
+    """
+    Returns the cached token if it exists, did not expire and was obtained
+    with the same password.
+    """
+    try:
+        content = _loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+
+    # Ignore entries not written by this client, a new login replaces them
+    if not isinstance(content, dict):
+        return None
+    created, token = content.get("created"), content.get("token")
+    salt, password_hash = content.get("salt"), content.get("password")
+    if not (
+        isinstance(created, (int, float))
+        and isinstance(token, str)
+        and isinstance(salt, str)
+        and isinstance(password_hash, str)
+    ):
+        return None
+
+    if time.time() - created > TOKEN_CACHE_TTL:
+        return None
+
+    # Never hand out a token for credentials the server did not accept
+    try:
+        expected = _password_hash(password, bytes.fromhex(salt))
+    except ValueError:
+        return None
+    return token if hmac.compare_digest(expected, password_hash) else None
+
+
+def _write_cached_token(path: Path, token: str, password: str):
+    """
+    Atomically stores a token on the cache, readable only by the current user.
+    """
+    salt = os.urandom(16)
+    content = {
+        "token": token,
+        "created": time.time(),
+        "salt": salt.hex(),
+        "password": _password_hash(password, salt),
+    }
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(path.parent, 0o700)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(_dumps(content))
+        os.chmod(tmp_path, 0o600)
+        os.replace(tmp_path, path)
+    except OSError:
+        # Cache is best effort, a missing entry only costs a new login
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _remove_cached_token(path: Path):
+    """
+    Removes a cached token, so it is not reused once a login failed.
+    """
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Serializes values not supported by ``json``, matching ``orjson`` output.
+    """
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(data: Any, sort_keys: bool = False) -> bytes:
+    """
+    Encodes data as JSON, using ``orjson`` when available.
+    """
+    if orjson is not None:
+        # Non str keys are converted to strings, as the json module does
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, default=_json_default, sort_keys=sort_keys).encode(
+        "utf-8"
+    )
+
+
+def _loads(content: Union[bytes, str]) -> Any:
+    """
+    Decodes JSON content, using ``orjson`` when available.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
@@ -0,0 +1,533 @@
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Tuple
+
+import asyncio
+
+from .api import (
+    LOAD_CHUNK_SIZE,
+    LOAD_CONCURRENCY,
+    NDJSON_REJECTED_STATUSES,
+    RETRY_ATTEMPTS,
+    RETRY_STATUSES,
+    BaseAwareDB,
+    _is_ndjson,
+    _json_files,
+    _load_path,
+    _loads,
+    _read_cached_token,
+    _read_json,
+    _remove_cached_token,
+    _retry_delay,
+    _write_cached_token,
+)
+
+try:
+    import aiohttp
+except ImportError:  # pragma: no cover
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+
+class AsyncAwareDB(BaseAwareDB):
+    """
+    Async Python API to interact with AwareDB.
+
+    All commands available on ``AwareDB`` return awaitables, so many of them
+    can run concurrently over the same connection pool with ``asyncio.gather``.
+
+    The connection is opened when entering the context manager:
+
+        async with AsyncAwareDB(db="<my_db>", token="<my_token>") as awaredb:
+            power, speed = await asyncio.gather(
+                awaredb.get("car.power"),
+                awaredb.get("car.speed"),
+            )
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        db: str,
+        token=None,
+        user: str = None,
+        password: str = None,
+        host: str = None,
+        token_cache: bool = False,
+        cache_size: int = 0,
+        compress: bool = False,
+        transport: str = "aiohttp",
+    ):
+        """
+        See ``BaseAwareDB`` for the connection parameters.
+
+        :param transport: HTTP client used, ``aiohttp`` or ``httpx`` to
+            multiplex concurrent requests over HTTP/2. Defaults to ``aiohttp``.
+        :type transport: str
+        """
+        if transport not in ("aiohttp", "httpx"):
+            raise ValueError(f"Unknown transport {transport}")
+        if transport == "aiohttp" and aiohttp is None:
+            raise ImportError(
+                "aiohttp is required for AsyncAwareDB: pip install awaredb[async]"
+            )
+        if transport == "httpx" and httpx is None:
+            raise ImportError(
+                "httpx is required for the httpx transport: pip install awaredb[http2]"
+            )
+        super().__init__(
+            db,
+            token=token,
+            user=user,
+            password=password,
+            host=host,
+            token_cache=token_cache,
+            cache_size=cache_size,
+            compress=compress,
+        )
+        self._transport = transport
+        self._session = None
+        self._connected = False
+        self._lock = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    # -------------------------------------------------------------------------
+    # Login and connection methods
+    # -------------------------------------------------------------------------
+
+    async def connect(self):
+        """
+        Opens the HTTP session, fetching a token if needed.
+        """
+        async with self._get_lock():
+            if self._connected:
+                return
+
+            # Session must be created inside the running event loop
+            if self._session is None:
+                self._session = self._open_session()
+
+            # If token is not provided, reuse a cached one or get it from the server,
+            # checking the password hash outside of the event loop
+            if not self.token and self._token_cache:
+                self.token = await asyncio.get_running_loop().run_in_executor(
+                    None, _read_cached_token, self._token_cache, self.password
+                )
+            if self.token:
+                self._session.headers.update(
+                    {"Authorization": f"Token {self.token}"}
+                )
+            else:
+                await self._update_token()
+            self._connected = True
+
+    def _open_session(self) -> Any:
+        """
+        Creates the HTTP session of the configured transport.
+        """
+        # Connection errors are retried by the transport, as on the sync client
+        if self._transport == "httpx":
+            return httpx.AsyncClient(
+                headers={"Content-Type": "application/json"},
+                timeout=180,
+                transport=httpx.AsyncHTTPTransport(
+                    http2=True,
+                    retries=RETRY_ATTEMPTS,
+                    limits=httpx.Limits(max_keepalive_connections=8),
+                ),
+            )
+        return aiohttp.ClientSession(
+            headers={"Content-Type": "application/json"},
+            connector=aiohttp.TCPConnector(limit_per_host=64),
+            timeout=aiohttp.ClientTimeout(total=180),
+        )
+
+    def _get_lock(self) -> asyncio.Lock:
+        """
+        Returns the lock serializing connection and login between tasks.
+
+        Created on first use so it belongs to the running event loop.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def close(self):
+        """
+        Closes the HTTP session and releases its connections.
+        """
+        if self._session is not None:
+            if self._transport == "httpx":
+                await self._session.aclose()
+            else:
+                await self._session.close()
+            self._session = None
+            self._connected = False
+
+    async def ping(self):
+        """
+        Check if token is valid and if database exists.
+
+        Connection is otherwise validated on the first command sent.
+        """
+        if not await self._check_connection():
+            raise ValueError("Unable to connect to database")
+
+    async def _check_connection(self):
+        """
+        Check if token is valid and if database exists.
+        """
+        return await self._request("check") == {"connected": True}
+
+    async def _login(self, rejected_token: str = None):
+        """
+        Get a new token from the server, unless another task already replaced
+        the rejected one.
+        """
+        async with self._get_lock():
+            if rejected_token is None or self.token == rejected_token:
+                await self._update_token()
+
+    async def _update_token(self):
+        """
+        Get a new token from the server and store it on the token cache.
+        """
+        # Login is sent without the rejected token, which the server may refuse
+        self._session.headers.pop("Authorization", None)
+        self.token = await self._get_token(user=self.user, password=self.password)
+        loop = asyncio.get_running_loop()
+        if self.token:
+            self._session.headers.update({"Authorization": f"Token {self.token}"})
+            if self._token_cache:
+                await loop.run_in_executor(
+                    None,
+                    _write_cached_token,
+                    self._token_cache,
+                    self.token,
+                    self.password,
+                )
+        elif self._token_cache:
+            await loop.run_in_executor(None, _remove_cached_token, self._token_cache)
+
+    async def _get_token(self, user: str = None, password: str = None):
+        """
+        Get a token from the server with the provided username and password.
+        """
+        _, content = await self._post(
+            f"{self.host}/rest/auth/token/login/",
+            {"username": user, "password": password},
+            timeout=30,
+        )
+        return _loads(content).get("token")
+
+    # -------------------------------------------------------------------------
+    # Generic methods to handle command requests
+    # -------------------------------------------------------------------------
+
+    async def _post(
+        self, url: str, payload: Any, timeout: float = 180
+    ) -> Tuple[int, bytes]:
+        """
+        Posts a payload encoded as JSON in a single pass, with the configured
+        transport, retrying transient errors with exponential backoff.
+
+        :return: Response status and content
+        :rtype: Tuple[int, bytes]
+        """
+        body, headers = self._encode(payload)
+        async with self._stream(url, body, headers, timeout) as response:
+            return self._status(response), await self._read_response(response)
+
+    @asynccontextmanager
+    async def _stream(
+        self,
+        url: str,
+        body: bytes,
+        headers: Dict[str, str],
+        timeout: float = 180,
+        read_timeout: bool = False,
+    ) -> AsyncIterator[Any]:
+        """
+        Posts an encoded body and yields the response before its content is
+        read, retrying transient errors with exponential backoff.
+
+        :param timeout: Seconds allowed for the whole request, or for each read
+            of the response if ``read_timeout`` is set.
+        :type timeout: float
+        :param read_timeout: Let long streamed responses run for any time, as
+            long as data keeps arriving. Defaults to False.
+        :type read_timeout: bool
+        """
+        for attempt in range(RETRY_ATTEMPTS + 1):
+            opened = self._open(url, body, headers, timeout, read_timeout)
+            async with opened as response:
+                status = self._status(response)
+                if status not in RETRY_STATUSES or attempt == RETRY_ATTEMPTS:
+                    yield response
+                    return
+                retry_after = response.headers.get("Retry-After")
+            await asyncio.sleep(_retry_delay(attempt, retry_after))
+
+    def _open(
+        self,
+        url: str,
+        body: bytes,
+        headers: Dict[str, str],
+        timeout: float,
+        read_timeout: bool,
+    ) -> Any:
+        """
+        Posts an encoded body once with the configured transport, as a context
+        manager giving the response before its content is read.
+        """
+        # httpx timeouts always apply to each operation, not the whole request
+        if self._transport == "httpx":
+            return self._session.stream(
+                "POST", url, content=body, headers=headers, timeout=timeout
+            )
+        if read_timeout:
+            client_timeout = aiohttp.ClientTimeout(total=None, sock_read=timeout)
+        else:
+            client_timeout = aiohttp.ClientTimeout(total=timeout)
+        return self._session.post(
+            url, data=body, headers=headers, timeout=client_timeout
+        )
+
+    def _status(self, response: Any) -> int:
+        """
+        Returns the status of a response of the configured transport.
+        """
+        if self._transport == "httpx":
+            return response.status_code
+        return response.status
+
+    def _then(self, response: Awaitable[Any], func: Callable[[Any], Any]) -> Any:
+        """
+        Applies a function to a response of ``_request`` once it is awaited.
+        """
+
+        async def then():
+            return func(await response)
+
+        return then()
+
+    # Commands of the base class return this coroutine to be awaited
+    async def _request(  # pylint: disable=invalid-overridden-method
+        self, command: str, data: Dict[str, Any] = None, fresh: bool = False
+    ) -> Any:
+        """
+        Run a command on the server
+
+        :param command: Command to execute on the server.
+        :type command: str
+        :param data: Data to send to the server as part of the command.
+        :type data: Dict[str, Any]
+        :param fresh: Skip the response cache. Defaults to False.
+        :type fresh: bool
+        :return: Servers response
+        :rtype: Any
+        """
+        key = self._cache_key(command, data or {})
+        if not fresh:
+            cached, result = self._cache_lookup(key)
+            if cached:
+                return result
+
+        if not self._connected:
+            await self.connect()
+
+        # Reads are not cached if a write clears the cache while in flight
+        generation = self._cache_generation
+        url = self._url(command)
+        token = self.token
+        status, content = await self._post(url, data or {})
+
+        # Token expired or was revoked, login again and retry once
+        if status == 401 and self._can_login():
+            await self._login(rejected_token=token)
+            status, content = await self._post(url, data or {})
+
+        self._check_response(status, content)
+
+        result = _loads(content).get("data")
+        self._cache_response(command, key, result, generation=generation)
+        return result
+
+    # -------------------------------------------------------------------------
+    # Streaming database commands
+    # -------------------------------------------------------------------------
+
+    async def query_iter(
+        self,
+        nodes: List[str] = None,
+        conditions: List[str] = None,
+        properties: List[str] = None,
+        states: List[str] = None,
+        show_abstract: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields nodes based on the input, as they are streamed by the server.
+
+        Takes the same parameters as ``query``. If the server does not stream
+        NDJSON, nodes are yielded from the regular response instead.
+        """
+        if not self._connected:
+            await self.connect()
+
+        url, body, headers = self._query_iter_request(
+            nodes, conditions, properties, states, show_abstract
+        )
+
+        # Token expired or was revoked, login again and retry once
+        for attempt in range(2):
+            token = self.token
+            # Response is closed by _stream, also when iteration stops early
+            # pylint: disable-next=contextmanager-generator-missing-cleanup
+            async with self._stream(
+                url, body, headers, read_timeout=True
+            ) as response:
+                status = self._status(response)
+                if status == 200:
+                    self._validated = True
+                    async for node in self._iter_response(response):
+                        yield node
+                    return
+                content = await self._read_response(response)
+
+            if status != 401 or attempt or not self._can_login():
+                break
+            await self._login(rejected_token=token)
+
+        # Server does not stream NDJSON, answer with a regular query
+        if status in NDJSON_REJECTED_STATUSES:
+            for node in await self.query(
+                nodes, conditions, properties, states, show_abstract, fresh=True
+            ):
+                yield node
+            return
+        self._check_response(status, content)
+
+    async def _iter_response(self, response: Any) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields nodes of a query response, streamed as NDJSON or not.
+        """
+        if not _is_ndjson(response.headers):
+            content = await self._read_response(response)
+            for node in _loads(content).get("data") or []:
+                yield node
+            return
+
+        async for line in self._iter_lines(response):
+            if line.strip():
+                yield _loads(line)
+
+    async def _iter_lines(self, response: Any) -> AsyncIterator[bytes]:
+        """
+        Yields the lines of a streamed response, however long they are.
+        """
+        if self._transport == "httpx":
+            async for line in response.aiter_lines():
+                yield line
+            return
+
+        # aiohttp readline fails on lines over its 128 KB buffer, split chunks here
+        line = bytearray()
+        async for data in response.content.iter_any():
+            start, end = 0, data.find(b"\n")
+            while end != -1:
+                line += data[start:end]
+                yield bytes(line)
+                line.clear()
+                start, end = end + 1, data.find(b"\n", end + 1)
+            line += data[start:]
+        if line:
+            yield bytes(line)
+
+    async def _read_response(self, response: Any) -> bytes:
+        """
+        Reads the whole content of a streamed response.
+        """
+        if self._transport == "httpx":
+            return await response.aread()
+        return await response.read()
+
+    # -------------------------------------------------------------------------
+    # Load and save database methods
+    # -------------------------------------------------------------------------
+
+    async def load(
+        self,
+        filepath: str,
+        recursive: bool = False,
+        flush: bool = False,
+        chunk_size: int = LOAD_CHUNK_SIZE,
+        concurrency: int = LOAD_CONCURRENCY,
+    ):
+        """
+        Load a file or folder of JSONs into the database.
+
+        Files are parsed one at a time in a thread and uploaded in chunks of
+        ``chunk_size`` nodes, with up to ``concurrency`` updates in flight, so
+        about ``concurrency`` chunks are kept in memory.
+
+        Unlike a single update, chunks are not applied atomically nor in order:
+        if one fails, the others stay applied, and a relation may reach the
+        server before the nodes it references in another chunk. Use
+        ``concurrency=1`` to send chunks one at a time in file order.
+        """
+        path = _load_path(filepath, chunk_size, concurrency)
+
+        # If flush is True, remove all data from database
+        if flush:
+            await self.flush()
+
+        # Chunks hold a semaphore slot until sent, waiters are served in order
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = set()
+        errors = []
+
+        # Errors are recorded before the slot is released to the next chunk
+        async def update(chunk: List[Dict[str, Any]]):
+            try:
+                await self.update(chunk)
+            except Exception as error:  # pylint: disable=broad-except
+                errors.append(error)
+            finally:
+                semaphore.release()
+
+        async def send(chunk: List[Dict[str, Any]]):
+            await semaphore.acquire()
+            # Stop reading files once a chunk failed
+            if errors:
+                semaphore.release()
+                raise errors[0]
+            task = asyncio.ensure_future(update(chunk))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        # Upload data to database as it is gathered
+        chunk = []
+        try:
+            for file in _json_files(path, recursive):
+                for node in await loop.run_in_executor(None, _read_json, file):
+                    chunk.append(node)
+                    if len(chunk) >= chunk_size:
+                        await send(chunk)
+                        chunk = []
+            if chunk:
+                await send(chunk)
+        finally:
+            # Chunks already sent are awaited, also when loading stopped early
+            await asyncio.gather(*tasks, return_exceptions=True)
+        if errors:
+            raise errors[0]
@@ -0,0 +1,191 @@
+"""
+Stub transports answering commands without an AwareDB server.
+"""
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple
+
+import inspect
+import json
+
+import pytest
+
+from awaredb import api, async_api
+
+
+class StubResponse:
+    """
+    Response of a stub request, with the attributes of the sync transports.
+
+    Content is given as JSON data, raw ``content`` or the ``chunks`` in which
+    it is streamed.
+    """
+
+    def __init__(self, status: int = 200, data: Any = None, **kwargs):
+        self.status_code = self.status = status
+        self.headers = kwargs.get("headers") or {}
+        self.chunks = kwargs.get("chunks") or [
+            kwargs.get("content") or json.dumps({"data": data}).encode()
+        ]
+        self.content = b"".join(self.chunks)
+
+    def iter_lines(self) -> Iterator[bytes]:
+        return iter(self.content.splitlines())
+
+
+class StubStream:
+    """
+    Content of a stub aiohttp response, streamed in the given chunks.
+    """
+
+    def __init__(self, chunks: List[bytes]):
+        self._chunks = chunks
+
+    async def iter_any(self) -> AsyncIterator[bytes]:
+        for chunk in self._chunks:
+            yield chunk
+
+
+class StubAsyncResponse:
+    """
+    Stub response with the attributes of an aiohttp response.
+    """
+
+    def __init__(self, response: StubResponse):
+        self.status = response.status
+        self.headers = response.headers
+        self.content = StubStream(response.chunks)
+        self._content = response.content
+
+    async def read(self) -> bytes:
+        return self._content
+
+
+class StubServer:
+    """
+    Answers commands in order, recording the requests received.
+
+    Answers are responses, data returned with status 200 or callables taking
+    the request payload and returning either. The last answer of a command is
+    repeated; commands without answers return ``None``.
+    """
+
+    def __init__(self):
+        self.requests: List[Tuple[str, Dict[str, Any], str]] = []
+        self._answers: Dict[str, List[Any]] = {}
+        self._logins = 0
+
+    def on(self, command: str, *answers: Any):
+        """
+        Sets the answers of a command.
+        """
+        self._answers[command] = list(answers)
+
+    def commands(self) -> List[str]:
+        """
+        Returns the commands received, in order.
+        """
+        return [command for command, _, _ in self.requests]
+
+    def _answer(self, url: str, body: bytes, headers: Dict[str, str]) -> Any:
+        command = url.rstrip("/").rsplit("/", 1)[-1]
+        payload = json.loads(body)
+        self.requests.append((command, payload, headers.get("Authorization")))
+
+        answers = self._answers.get(command)
+        if answers:
+            answer = answers.pop(0) if len(answers) > 1 else answers[0]
+        elif command == "login":
+            self._logins += 1
+            answer = StubResponse(
+                content=json.dumps({"token": f"token-{self._logins}"}).encode()
+            )
+        else:
+            answer = None
+        return answer(payload) if callable(answer) else answer
+
+    def answer(self, url: str, body: bytes, headers: Dict[str, str]) -> StubResponse:
+        """
+        Answers a request of the sync client.
+        """
+        answer = self._answer(url, body, headers)
+        return answer if isinstance(answer, StubResponse) else StubResponse(data=answer)
+
+    async def answer_async(
+        self, url: str, body: bytes, headers: Dict[str, str]
+    ) -> StubAsyncResponse:
+        """
+        Answers a request of the async client, awaiting coroutine answers.
+        """
+        answer = self._answer(url, body, headers)
+        if inspect.isawaitable(answer):
+            answer = await answer
+        if not isinstance(answer, StubResponse):
+            answer = StubResponse(data=answer)
+        return StubAsyncResponse(answer)
+
+
+class StubSession:
+    """
+    Session of the async client, only keeping its headers.
+    """
+
+    def __init__(self):
+        self.headers: Dict[str, str] = {}
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch) -> StubServer:
+    """
+    Routes requests of ``AwareDB`` and ``AsyncAwareDB`` to a stub server.
+    """
+    stub = StubServer()
+
+    class StubTransport:
+        def __init__(self):
+            self.headers: Dict[str, str] = {}
+
+        def post(self, url, body, headers, timeout):
+            return stub.answer(url, body, {**self.headers, **headers})
+
+        @contextmanager
+        def stream(self, url, body, headers, timeout):
+            yield self.post(url, body, headers, timeout)
+
+        @staticmethod
+        def read(response):
+            return response.content
+
+        def close(self):
+            pass
+
+    @asynccontextmanager
+    async def stream(db, url, body, headers):
+        yield await stub.answer_async(url, body, {**db._session.headers, **headers})
+
+    def open_stream(db, url, body, headers, timeout, read_timeout):
+        return stream(db, url, body, headers)
+
+    monkeypatch.setattr(api, "_RequestsTransport", StubTransport)
+    monkeypatch.setattr(
+        async_api.AsyncAwareDB, "_open_session", lambda db: StubSession()
+    )
+    monkeypatch.setattr(async_api.AsyncAwareDB, "_open", open_stream)
+    return stub
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> List[float]:
+    """
+    Records the retry waits instead of sleeping.
+    """
+    delays: List[float] = []
+
+    async def sleep(delay: float):
+        delays.append(delay)
+
+    monkeypatch.setattr(api.time, "sleep", delays.append)
+    monkeypatch.setattr(async_api.asyncio, "sleep", sleep)
+    return delays
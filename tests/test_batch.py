@@ -0,0 +1,142 @@
+from concurrent.futures import Future
+
+import asyncio
+
+import pytest
+
+from awaredb import AsyncAwareDB, AwareDB
+
+from .conftest import StubResponse
+
+
+def values(payload):
+    data = {"car.power": "250 hp", "car.range": "300 km"}
+    if "formula" in payload:
+        return [data[path] for path in payload["formula"]]
+    return data[payload["path"]]
+
+
+def test_batch_sends_gets_in_a_single_request(server):
+    server.on("calculate", values)
+    db = AwareDB(db="db", token="token")
+
+    with db.batch():
+        power = db.get("car.power")
+        range_ = db.get("car.range")
+        assert isinstance(power, Future) and not power.done()
+
+    assert server.commands() == ["calculate"]
+    assert server.requests[0][1] == {
+        "formula": ["car.power", "car.range"],
+        "states": [],
+    }
+    assert (power.result(), range_.result()) == ("250 hp", "300 km")
+
+
+def test_batch_groups_gets_by_states(server):
+    server.on("calculate", values)
+    db = AwareDB(db="db", token="token")
+
+    with db.batch():
+        db.get("car.power", states=["model.x"])
+        db.get("car.range", states=["model.x"])
+        db.get("car.power")
+        db.get("car.range")
+
+    assert server.commands() == ["calculate", "calculate"]
+    assert sorted(payload["states"] for _, payload, _ in server.requests) == [
+        [],
+        ["model.x"],
+    ]
+
+
+def test_batch_sends_a_single_get_as_get(server):
+    server.on("get", values)
+    db = AwareDB(db="db", token="token")
+
+    with db.batch():
+        power = db.get("car.power")
+
+    assert server.commands() == ["get"]
+    assert power.result() == "250 hp"
+
+
+def test_batch_errors_reject_every_future(server):
+    server.on("calculate", StubResponse(status=400, content=b'{"error": "bad"}'))
+    db = AwareDB(db="db", token="token")
+
+    with db.batch():
+        power = db.get("car.power")
+        range_ = db.get("car.range")
+
+    for future in (power, range_):
+        with pytest.raises(ValueError, match="Invalid request"):
+            future.result()
+
+
+def test_batch_rejects_responses_not_matching_the_paths(server):
+    server.on("calculate", ["250 hp"])
+    db = AwareDB(db="db", token="token")
+
+    with db.batch():
+        power = db.get("car.power")
+        range_ = db.get("car.range")
+
+    for future in (power, range_):
+        with pytest.raises(ValueError, match="Invalid batch response"):
+            future.result()
+
+
+def test_batch_window_sends_gets_from_a_timer(server):
+    server.on("calculate", values)
+    db = AwareDB(db="db", token="token", batch_window_ms=10)
+
+    power = db.get("car.power")
+    range_ = db.get("car.range")
+
+    assert (power.result(timeout=5), range_.result(timeout=5)) == ("250 hp", "300 km")
+    assert server.commands() == ["calculate"]
+
+
+def test_batch_window_sends_gets_before_writes(server):
+    server.on("calculate", values)
+    db = AwareDB(db="db", token="token", batch_window_ms=60_000)
+
+    power = db.get("car.power")
+    range_ = db.get("car.range")
+    db.update([{"uid": "car"}])
+
+    assert server.commands() == ["calculate", "update"]
+    assert (power.result(), range_.result()) == ("250 hp", "300 km")
+
+
+def test_close_sends_queued_gets(server):
+    server.on("calculate", values)
+    with AwareDB(db="db", token="token", batch_window_ms=60_000) as db:
+        power = db.get("car.power")
+        range_ = db.get("car.range")
+
+    assert (power.result(), range_.result()) == ("250 hp", "300 km")
+
+
+def test_get_many_returns_a_list(server):
+    server.on("calculate", values)
+    server.on("get", values)
+    db = AwareDB(db="db", token="token")
+
+    assert db.get_many(["car.power", "car.range"]) == ["250 hp", "300 km"]
+    assert db.get_many(["car.power"]) == ["250 hp"]
+    assert server.commands() == ["calculate", "get"]
+
+
+def test_async_get_many_returns_a_list(server):
+    server.on("calculate", values)
+    server.on("get", values)
+
+    async def main():
+        async with AsyncAwareDB(db="db", token="token") as db:
+            return await asyncio.gather(
+                db.get_many(["car.power", "car.range"]), db.get_many(["car.power"])
+            )
+
+    assert asyncio.run(main()) == [["250 hp", "300 km"], ["250 hp"]]
@@ -0,0 +1,112 @@
+import asyncio
+
+from awaredb import AsyncAwareDB, AwareDB
+
+
+def test_cache_reuses_read_responses(server):
+    server.on("get", 1)
+    db = AwareDB(db="db", token="token", cache_size=10)
+
+    assert db.get("a") == 1
+    assert db.get("a") == 1
+    assert db.get("a", fresh=True) == 1
+
+    assert server.commands() == ["get", "get"]
+
+
+def test_cache_is_disabled_by_default(server):
+    server.on("get", 1)
+    db = AwareDB(db="db", token="token")
+
+    db.get("a")
+    db.get("a")
+
+    assert server.commands() == ["get", "get"]
+
+
+def test_cache_returns_copies(server):
+    server.on("query", [{"uid": "car"}])
+    db = AwareDB(db="db", token="token", cache_size=10)
+
+    db.query()[0]["uid"] = "changed"
+
+    assert db.query() == [{"uid": "car"}]
+
+
+def test_cache_evicts_least_recently_used(server):
+    server.on("get", lambda payload: payload["path"])
+    db = AwareDB(db="db", token="token", cache_size=2)
+
+    db.get("a")
+    db.get("b")
+    db.get("a")
+    db.get("c")
+    db.get("a")
+    db.get("b")
+
+    paths = [payload["path"] for _, payload, _ in server.requests]
+    assert paths == ["a", "b", "c", "b"]
+
+
+def test_cache_is_cleared_on_writes(server):
+    server.on("get", 1, 2)
+    db = AwareDB(db="db", token="token", cache_size=10)
+
+    assert db.get("a") == 1
+    db.update([{"uid": "a", "value": 2}])
+
+    assert db.get("a") == 2
+
+
+def test_cache_skips_reads_answered_during_a_write(server):
+    db = AwareDB(db="db", token="token", cache_size=10)
+
+    # Another thread writes while the read is on its way back
+    def stale(payload):
+        db.update([{"uid": "a", "value": 2}])
+        return 1
+
+    server.on("get", stale, 2)
+
+    assert db.get("a") == 1
+    assert db.get("a") == 2
+
+
+def test_cache_skips_batched_reads_answered_during_a_write(server):
+    db = AwareDB(db="db", token="token", cache_size=10)
+
+    def stale(payload):
+        db._cache_response("update", None, None)
+        return [1, 1]
+
+    server.on("calculate", stale, [2, 2])
+
+    with db.batch():
+        first = db.get("a")
+        db.get("b")
+    with db.batch():
+        second = db.get("a")
+        db.get("b")
+
+    assert (first.result(), second.result()) == (1, 2)
+
+
+def test_async_cache_skips_reads_answered_during_a_write(server):
+    async def main():
+        written = asyncio.Event()
+
+        async def stale(payload):
+            await written.wait()
+            return 1
+
+        async def update(payload):
+            written.set()
+
+        server.on("get", stale, 2)
+        server.on("update", update)
+
+        async with AsyncAwareDB(db="db", token="token", cache_size=10) as db:
+            await asyncio.gather(db.get("a"), db.update([{"uid": "a", "value": 2}]))
+            return await db.get("a")
+
+    assert asyncio.run(main()) == 2
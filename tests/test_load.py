@@ -0,0 +1,165 @@
+import asyncio
+import json
+
+import pytest
+
+from awaredb import AsyncAwareDB, AwareDB
+
+from .conftest import StubResponse
+
+
+@pytest.fixture
+def folder(tmp_path):
+    """
+    Folder of JSON files, with a subfolder and files that are not loaded.
+    """
+    (tmp_path / "cars.json").write_text(json.dumps([{"uid": "a"}, {"uid": "b"}]))
+    (tmp_path / "car.JSON").write_text(json.dumps({"uid": "c"}))
+    (tmp_path / "notes.txt").write_text("not loaded")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "wheels.json").write_text(
+        json.dumps([{"uid": "d"}, {"uid": "e"}, {"uid": "f"}])
+    )
+    return tmp_path
+
+
+def uploaded(server):
+    return [
+        payload["data"]
+        for command, payload, _ in server.requests
+        if command == "update"
+    ]
+
+
+def uids(chunks):
+    return sorted(node["uid"] for chunk in chunks for node in chunk)
+
+
+def load_async(path, **kwargs):
+    async def main():
+        async with AsyncAwareDB(db="db", token="token") as db:
+            await db.load(str(path), **kwargs)
+
+    asyncio.run(main())
+
+
+def test_load_sends_nodes_in_chunks(server, folder):
+    AwareDB(db="db", token="token").load(str(folder), recursive=True, chunk_size=2)
+
+    chunks = uploaded(server)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2]
+    assert uids(chunks) == ["a", "b", "c", "d", "e", "f"]
+
+
+def test_load_skips_subfolders_unless_recursive(server, folder):
+    AwareDB(db="db", token="token").load(str(folder))
+
+    assert uids(uploaded(server)) == ["a", "b", "c"]
+
+
+def test_load_a_single_file(server, folder):
+    AwareDB(db="db", token="token").load(str(folder / "sub" / "wheels.json"))
+
+    assert uploaded(server) == [[{"uid": "d"}, {"uid": "e"}, {"uid": "f"}]]
+
+
+def test_load_follows_symlinked_folders(server, folder, tmp_path_factory):
+    linked = tmp_path_factory.mktemp("linked")
+    (linked / "doors.json").write_text(json.dumps({"uid": "g"}))
+    try:
+        (folder / "link").symlink_to(linked, target_is_directory=True)
+    except OSError:
+        pytest.skip("symlinks are not supported")
+
+    AwareDB(db="db", token="token").load(str(folder), recursive=True)
+
+    assert uids(uploaded(server)) == ["a", "b", "c", "d", "e", "f", "g"]
+
+
+def test_load_flushes_first(server, folder):
+    AwareDB(db="db", token="token").load(str(folder), flush=True)
+
+    assert server.commands()[0] == "flush"
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"filepath": "missing"}, "does not exist"),
+        ({"chunk_size": 0}, "Chunk size must be at least 1"),
+    ],
+)
+def test_load_checks_arguments(server, folder, kwargs, message):
+    kwargs = {"filepath": str(folder), **kwargs}
+
+    with pytest.raises(ValueError, match=message):
+        AwareDB(db="db", token="token").load(**kwargs)
+    assert not server.requests
+
+
+def test_load_stops_on_failed_chunks(server, folder):
+    server.on("update", None, StubResponse(status=500, content=b"error"), None)
+
+    with pytest.raises(ValueError, match="Invalid request"):
+        AwareDB(db="db", token="token").load(str(folder), recursive=True, chunk_size=2)
+    assert server.commands() == ["update", "update"]
+
+
+def test_async_load_sends_nodes_in_chunks(server, folder):
+    load_async(folder, recursive=True, chunk_size=2)
+
+    chunks = uploaded(server)
+    assert [len(chunk) for chunk in chunks] == [2, 2, 2]
+    assert uids(chunks) == ["a", "b", "c", "d", "e", "f"]
+
+
+def test_async_load_skips_subfolders_unless_recursive(server, folder):
+    load_async(folder)
+
+    assert uids(uploaded(server)) == ["a", "b", "c"]
+
+
+def test_async_load_bounds_updates_in_flight(server, folder):
+    in_flight = []
+    peak = []
+
+    async def update(payload):
+        in_flight.append(payload)
+        peak.append(len(in_flight))
+        await asyncio.sleep(0.01)
+        in_flight.remove(payload)
+
+    server.on("update", update)
+    load_async(folder, recursive=True, chunk_size=1, concurrency=2)
+
+    assert len(uploaded(server)) == 6
+    assert max(peak) == 2
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"filepath": "missing"}, "does not exist"),
+        ({"chunk_size": 0}, "Chunk size must be at least 1"),
+        ({"concurrency": 0}, "Concurrency must be at least 1"),
+        ({"concurrency": -1}, "Concurrency must be at least 1"),
+    ],
+)
+def test_async_load_checks_arguments(server, folder, kwargs, message):
+    kwargs = {"filepath": str(folder), **kwargs}
+
+    async def main():
+        async with AsyncAwareDB(db="db", token="token") as db:
+            await asyncio.wait_for(db.load(**kwargs), timeout=5)
+
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(main())
+    assert not server.requests
+
+
+def test_async_load_stops_on_failed_chunks(server, folder):
+    server.on("update", None, StubResponse(status=500, content=b"error"), None)
+
+    with pytest.raises(ValueError, match="Invalid request"):
+        load_async(folder, recursive=True, chunk_size=2, concurrency=1)
+    assert server.commands() == ["update", "update"]
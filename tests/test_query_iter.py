@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from awaredb import AsyncAwareDB, AwareDB
+
+from .conftest import StubResponse
+
+NODES = [{"uid": "car"}, {"uid": "wheel", "name": "x" * 200_000}, {"uid": "door"}]
+NDJSON = {"Content-Type": "application/x-ndjson"}
+
+
+def ndjson(*chunks):
+    return StubResponse(headers=NDJSON, chunks=list(chunks))
+
+
+def lines():
+    return [
+        b'{"uid": "car"}\r\n',
+        b"\n",
+        b'{"uid": "wheel", "name": "' + b"x" * 200_000 + b'"}\n',
+        b'{"uid": "door"}',
+    ]
+
+
+def chunked(content, size):
+    return [content[i : i + size] for i in range(0, len(content), size)]
+
+
+def query_iter_async(**kwargs):
+    async def main():
+        async with AsyncAwareDB(db="db", **kwargs) as db:
+            return [node async for node in db.query_iter()]
+
+    return asyncio.run(main())
+
+
+def test_query_iter_parses_ndjson(server):
+    server.on("query", ndjson(*lines()))
+    db = AwareDB(db="db", token="token")
+
+    assert list(db.query_iter()) == NODES
+
+
+def test_query_iter_reads_regular_responses(server):
+    server.on("query", NODES)
+    db = AwareDB(db="db", token="token")
+
+    assert list(db.query_iter()) == NODES
+
+
+@pytest.mark.parametrize("status", [406, 415])
+def test_query_iter_falls_back_to_query(server, status):
+    server.on("query", StubResponse(status=status), NODES)
+    db = AwareDB(db="db", token="token")
+
+    assert list(db.query_iter()) == NODES
+    assert server.commands() == ["query", "query"]
+
+
+def test_query_iter_raises_other_errors(server):
+    server.on("query", StubResponse(status=500, content=b"error"))
+    db = AwareDB(db="db", token="token")
+
+    with pytest.raises(ValueError, match="Invalid request"):
+        list(db.query_iter())
+
+
+def test_query_iter_logs_in_again_when_token_is_rejected(server):
+    server.on("query", StubResponse(status=401), ndjson(*lines()))
+    db = AwareDB(db="db", user="user", password="password")
+
+    assert list(db.query_iter()) == NODES
+    assert [(command, token) for command, _, token in server.requests] == [
+        ("login", None),
+        ("query", "Token token-1"),
+        ("login", None),
+        ("query", "Token token-2"),
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 7, 64 * 1024, 1024 * 1024])
+def test_async_query_iter_splits_lines_across_chunks(server, size):
+    server.on("query", ndjson(*chunked(b"".join(lines()), size)))
+
+    assert query_iter_async(token="token") == NODES
+
+
+def test_async_query_iter_reads_regular_responses(server):
+    server.on("query", NODES)
+
+    assert query_iter_async(token="token") == NODES
+
+
+@pytest.mark.parametrize("status", [406, 415])
+def test_async_query_iter_falls_back_to_query(server, status):
+    server.on("query", StubResponse(status=status), NODES)
+
+    assert query_iter_async(token="token") == NODES
+    assert server.commands() == ["query", "query"]
+
+
+def test_async_query_iter_logs_in_again_when_token_is_rejected(server):
+    server.on("query", StubResponse(status=401), ndjson(*lines()))
+
+    assert query_iter_async(user="user", password="password") == NODES
+    assert [(command, token) for command, _, token in server.requests] == [
+        ("login", None),
+        ("query", "Token token-1"),
+        ("login", None),
+        ("query", "Token token-2"),
+    ]
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+
+from awaredb import AsyncAwareDB, AwareDB
+from awaredb.api import (
+    RETRY_ATTEMPTS,
+    RETRY_MAX_DELAY,
+    _RequestsTransport,
+    _Retry,
+    _retry_delay,
+)
+
+from .conftest import StubResponse
+
+
+class Response:
+    def __init__(self, retry_after):
+        self.headers = {"Retry-After": retry_after}
+
+
+def test_retry_delay_follows_retry_after():
+    assert _retry_delay(0, "2") == 2.0
+    assert _retry_delay(0, "0") == 0.0
+    assert _retry_delay(0, "3600") == RETRY_MAX_DELAY
+
+
+def test_retry_delay_backs_off_on_invalid_retry_after():
+    for retry_after in (None, "soon", "-1", "nan"):
+        assert 0.15 <= _retry_delay(0, retry_after) <= 0.3
+    assert 1.2 <= _retry_delay(3, "soon") <= 2.4
+    assert _retry_delay(20) <= RETRY_MAX_DELAY
+
+
+def test_requests_transport_caps_retry_after():
+    retry = _RequestsTransport()._session.get_adapter("http://host").max_retries
+
+    assert isinstance(retry, _Retry)
+    assert retry.total == RETRY_ATTEMPTS
+    assert retry.get_retry_after(Response("2")) == 2
+    assert retry.get_retry_after(Response("3600")) == RETRY_MAX_DELAY
+    assert retry.get_retry_after(Response("soon")) is None
+
+
+def test_httpx_transport_retries_transient_statuses(sleeps):
+    httpx = pytest.importorskip("httpx")
+    from awaredb.api import _HttpxTransport  # pylint: disable=import-outside-toplevel
+
+    statuses = iter([503, 429, 502, 200])
+
+    def handler(request):
+        status = next(statuses)
+        return httpx.Response(status, headers={"Retry-After": "3600"}, json={})
+
+    transport = _HttpxTransport()
+    transport._session = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert transport.post("http://host/", b"{}", {}, 10).status_code == 200
+    assert sleeps == [RETRY_MAX_DELAY] * 3
+
+
+def test_httpx_transport_stops_after_retry_attempts(sleeps):
+    httpx = pytest.importorskip("httpx")
+    from awaredb.api import _HttpxTransport  # pylint: disable=import-outside-toplevel
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(503)
+
+    transport = _HttpxTransport()
+    transport._session = httpx.Client(transport=httpx.MockTransport(handler))
+
+    assert transport.post("http://host/", b"{}", {}, 10).status_code == 503
+    assert len(requests) == RETRY_ATTEMPTS + 1
+    assert len(sleeps) == RETRY_ATTEMPTS
+
+
+def test_async_retries_transient_statuses(server, sleeps):
+    server.on(
+        "get",
+        StubResponse(status=429, headers={"Retry-After": "2"}),
+        StubResponse(status=503, headers={"Retry-After": "3600"}),
+        StubResponse(status=502),
+        1,
+    )
+
+    async def main():
+        async with AsyncAwareDB(db="db", token="token") as db:
+            return await db.get("a")
+
+    assert asyncio.run(main()) == 1
+    assert server.commands() == ["get"] * 4
+    assert sleeps[:2] == [2.0, RETRY_MAX_DELAY]
+    assert 0.6 <= sleeps[2] <= 1.2
+
+
+def test_async_stops_after_retry_attempts(server, sleeps):
+    server.on("get", StubResponse(status=503))
+
+    async def main():
+        async with AsyncAwareDB(db="db", token="token") as db:
+            await db.get("a")
+
+    with pytest.raises(ValueError, match="Invalid request"):
+        asyncio.run(main())
+    assert server.commands() == ["get"] * (RETRY_ATTEMPTS + 1)
+    assert len(sleeps) == RETRY_ATTEMPTS
+
+
+def test_login_again_when_token_is_rejected(server):
+    server.on("get", StubResponse(status=401), 1)
+    db = AwareDB(db="db", user="user", password="password")
+
+    assert db.get("a") == 1
+    assert db.token == "token-2"
+    assert [(command, token) for command, _, token in server.requests] == [
+        ("login", None),
+        ("get", "Token token-1"),
+        ("login", None),
+        ("get", "Token token-2"),
+    ]
+
+
+def test_rejected_token_raises_without_credentials(server):
+    server.on("get", StubResponse(status=401, content=b'{"detail": "expired"}'))
+    db = AwareDB(db="db", token="token")
+
+    with pytest.raises(ValueError, match="Unable to connect"):
+        db.get("a")
+    assert server.commands() == ["get"]
+
+
+def test_async_logs_in_once_for_concurrent_rejections(server):
+    async def main():
+        sent = asyncio.Event()
+        rejected = []
+
+        # Both requests are sent with the same token before it is rejected
+        async def reject(payload):
+            rejected.append(payload)
+            if len(rejected) == 2:
+                sent.set()
+            await sent.wait()
+            return StubResponse(status=401)
+
+        server.on("get", reject, reject, 1)
+        async with AsyncAwareDB(db="db", user="user", password="password") as db:
+            return await asyncio.gather(db.get("a"), db.get("b")), db.token
+
+    assert asyncio.run(main()) == ([1, 1], "token-2")
+    assert server.commands() == ["login", "get", "get", "login", "get", "get"]
+    assert [token for command, _, token in server.requests if command == "login"] == [
+        None,
+        None,
+    ]
+
+
+def test_httpx_transports_retry_connection_errors():
+    pytest.importorskip("httpx")
+    from awaredb.api import _HttpxTransport  # pylint: disable=import-outside-toplevel
+
+    async def main():
+        db = AsyncAwareDB(db="db", token="token", transport="httpx")
+        session = db._open_session()
+        await session.aclose()
+        return session
+
+    for session in (_HttpxTransport()._session, asyncio.run(main())):
+        pool = session._transport._pool
+        assert (pool._retries, pool._http2) == (RETRY_ATTEMPTS, True)
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import stat
+
+import pytest
+
+from awaredb import AsyncAwareDB, AwareDB, api
+from awaredb.api import (
+    TOKEN_CACHE_TTL,
+    _read_cached_token,
+    _token_cache_path,
+    _write_cached_token,
+)
+
+from .conftest import StubResponse
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    """
+    Keeps the token cache under a temporary folder, with a fast hash.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(api, "TOKEN_CACHE_HASH_ITERATIONS", 1)
+    return tmp_path
+
+
+@pytest.fixture
+def path(cache_home):
+    return _token_cache_path("https://host", "db", "user")
+
+
+def test_cached_token_round_trip(path):
+    _write_cached_token(path, "token", "password")
+
+    assert _read_cached_token(path, "password") == "token"
+
+
+def test_cached_token_requires_the_same_password(path):
+    _write_cached_token(path, "token", "password")
+
+    assert _read_cached_token(path, "other") is None
+
+
+def test_cached_token_expires(path, monkeypatch):
+    _write_cached_token(path, "token", "password")
+    now = api.time.time()
+    monkeypatch.setattr(api.time, "time", lambda: now + TOKEN_CACHE_TTL + 1)
+
+    assert _read_cached_token(path, "password") is None
+
+
+def test_cached_token_file_is_private(path, cache_home):
+    _write_cached_token(path, "token", "s3cret")
+
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+    assert path.parent == cache_home / "awaredb"
+    assert "s3cret" not in path.read_text()
+
+
+def test_cache_path_depends_on_host_database_and_user():
+    paths = {
+        _token_cache_path("https://host", "db", "user"),
+        _token_cache_path("https://other", "db", "user"),
+        _token_cache_path("https://host", "other", "user"),
+        _token_cache_path("https://host", "db", "other"),
+    }
+    assert len(paths) == 4
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        b"[1, 2]",
+        b"null",
+        b"not json",
+        b'{"token": "token"}',
+        b'{"token": 1, "created": 0, "salt": "00", "password": "00"}',
+    ],
+)
+def test_malformed_cache_entries_are_ignored(path, content):
+    path.parent.mkdir(parents=True)
+    path.write_bytes(content)
+
+    assert _read_cached_token(path, "password") is None
+
+
+def test_cache_entries_with_a_bad_salt_are_ignored(path):
+    _write_cached_token(path, "token", "password")
+    content = json.loads(path.read_bytes())
+    content["salt"] = "not hex"
+    path.write_text(json.dumps(content))
+
+    assert _read_cached_token(path, "password") is None
+
+
+def test_missing_cache_entries_are_ignored(path):
+    assert _read_cached_token(path, "password") is None
+
+
+def test_token_cache_is_opt_in(server, path):
+    AwareDB(db="db", user="user", password="password", host="https://host")
+
+    assert not path.exists()
+
+
+def test_cached_token_skips_login(server, path):
+    for _ in range(2):
+        db = AwareDB(
+            db="db",
+            user="user",
+            password="password",
+            host="https://host",
+            token_cache=True,
+        )
+        db.get("a")
+
+    assert server.commands() == ["login", "get", "get"]
+    assert db.token == "token-1"
+
+
+def test_rejected_cached_token_is_refreshed(server, path):
+    _write_cached_token(path, "stale", "password")
+    server.on("get", StubResponse(status=401), 1)
+
+    db = AwareDB(
+        db="db", user="user", password="password", host="https://host", token_cache=True
+    )
+
+    assert db.get("a") == 1
+    assert [(command, token) for command, _, token in server.requests] == [
+        ("get", "Token stale"),
+        ("login", None),
+        ("get", "Token token-1"),
+    ]
+    assert _read_cached_token(path, "password") == "token-1"
+
+
+def test_failed_login_removes_cached_token(server, path):
+    _write_cached_token(path, "stale", "password")
+    server.on("get", StubResponse(status=401))
+    server.on("login", StubResponse(status=400, content=b'{"token": null}'))
+
+    db = AwareDB(
+        db="db", user="user", password="password", host="https://host", token_cache=True
+    )
+
+    with pytest.raises(ValueError, match="Unable to connect"):
+        db.get("a")
+    assert not path.exists()
+    assert server.requests[-1] == ("get", {"path": "a", "states": []}, None)
+
+
+def test_async_cached_token_skips_login(server, path):
+    _write_cached_token(path, "cached", "password")
+
+    async def main():
+        async with AsyncAwareDB(
+            db="db",
+            user="user",
+            password="password",
+            host="https://host",
+            token_cache=True,
+        ) as db:
+            await db.get("a")
+
+    asyncio.run(main())
+    assert [(command, token) for command, _, token in server.requests] == [
+        ("get", "Token cached"),
+    ]
+
+
+def test_async_failed_login_removes_cached_token(server, path):
+    _write_cached_token(path, "stale", "password")
+    server.on("get", StubResponse(status=401))
+    server.on("login", StubResponse(status=400, content=b'{"token": null}'))
+
+    async def main():
+        async with AsyncAwareDB(
+            db="db",
+            user="user",
+            password="password",
+            host="https://host",
+            token_cache=True,
+        ) as db:
+            await db.get("a")
+
+    with pytest.raises(ValueError, match="Unable to connect"):
+        asyncio.run(main())
+    assert not path.exists()